@@ -4,6 +4,7 @@ import os
 import signal
 import sys
 from pathlib import Path
+from src import hydra
 from src import work
 
 HELP = """
@@ -21,6 +22,7 @@ def parse_args(argv):
     parser.add_argument('--verbose', default=False, action='store_true', help='show more detailed messages')
     parser.add_argument('--debug', action='store_true', help='print as much information as possible')
     parser.add_argument('--quiet', action='store_true', help='print as little output as possible, only error messages')
+    parser.add_argument('--checkpoint', metavar='PATH', help='periodically write counter statistics as JSON to PATH')
 
     commands = []
     subparsers = parser.add_subparsers(dest='command')
@@ -29,15 +31,13 @@ def parse_args(argv):
         commands.append(name)
         return subparsers.add_parser(name, *args, **kwargs)
 
-    x = add_command('backup', help='run backup jobs')
-    x.add_argument('--dry-run', '-n', action='store_true', help='do not backup, preview what would happen only')
-    x.add_argument('--daily', action='store_true', help='')
-
     # 'hydra init'
     x = add_command('init', help='initialize a Hydra instance')
 
     # 'hydra backup'
     x = add_command('backup', help='run all backup jobs')
+    x.add_argument('--dry-run', '-n', action='store_true', help='do not backup, preview what would happen only')
+    x.add_argument('--daily', action='store_true', help='')
     x.add_argument('--force', action='store_true', help='always run backup even if ahead of schedule')
 
     # 'hydra verify'
@@ -59,7 +59,7 @@ def parse_args(argv):
     x = add_command('doctor', help='diagnose issues')
 
     # check for default command
-    if argv and argv[0] not in commands:
+    if argv and not argv[0].startswith('-') and argv[0] not in commands:
         argv.insert(0, "add")
 
     args, unknown_args = parser.parse_known_args(argv)
@@ -91,7 +91,7 @@ def cli_mapper(args):
 
 def main(argv):
     args = parse_args(argv)
-    args.work = work.Work(configdir=args.configdir)
+    args.work = work.Work(configdir=args.configdir, checkpoint=args.checkpoint)
     cli_mapper(args)
 
 
@@ -114,7 +114,7 @@ def entrypoint():  # pragma: no cover
     try:
         register_sigterm()
         main(sys.argv[1:])
-    except Fail as f:
+    except (Fail, hydra.Fail) as f:
         print(*f.args, file=sys.stderr)
         sys.exit(1)
     except SigtermInterrupt:
@@ -1,8 +1,12 @@
 import fcntl
+import heapq
+import itertools
 import os
 import signal
+import subprocess
 import time
 import yaml
+from typing import NamedTuple
 from .jobs import Job, JobGroup
 
 
@@ -43,29 +47,39 @@ def register_sigterm():
     signal.signal(signal.SIGTERM, exit_gracefully)
 
 
-def config_to_jobgroup(y) -> JobGroup:
-    jobgroup_name = y['hydra']['name']
-    jobs = []
-
+def config_to_backups(y) -> list[dict]:
     backups = []
     for name, backup in y['backups'].items():
         backup['name'] = name
         storage = y['storages'][backup['storage']]
         backup['storage'] = storage
         backup['env'] = configure_backup_runtime(backup)
-        print(backup)
         backups.append(backup)
+    return backups
+
+
+def build_command(y, template: str) -> list[str]:
+    cmd = template.split()
+    try:
+        path_idx = cmd.index('{}')
+        cmd = cmd[:path_idx] + y['files']['paths'] + cmd[path_idx + 1:]
+    except ValueError:
+        pass
+    return cmd
+
+
+def config_to_jobgroup(y) -> JobGroup:
+    jobgroup_name = y['hydra']['name']
+    jobs = []
+
+    backups = config_to_backups(y)
+    for backup in backups:
+        print(backup)
 
     for phase in "backup verify maintain".split():
         for backup in backups:
-            cmd = y['methods'][backup['method']][phase]
-            cmd = cmd.split()
-            try:
-                path_idx = cmd.index('{}')
-                cmd = cmd[:path_idx] + y['files']['paths'] + cmd[path_idx + 1:]
-            except ValueError:
-                pass
-            job = Job(name=f"{name}-{phase}", cwd="/tmp", command=cmd, env=backup['env'])
+            cmd = build_command(y, y['methods'][backup['method']][phase])
+            job = Job(name=f"{backup['name']}-{phase}", cwd="/tmp", command=cmd, env=backup['env'])
             jobs.append(job)
 
     for j in jobs:
@@ -74,6 +88,110 @@ def config_to_jobgroup(y) -> JobGroup:
     return JobGroup(name=jobgroup_name, jobs=jobs)
 
 
+class Listing(NamedTuple):
+    lister: subprocess.Popen
+    sorter: subprocess.Popen
+
+
+def start_listing(y, backup) -> Listing:
+    """Start the method's list command for one head, piped through an external
+    sort so that listings arrive in byte order without being held in memory.
+    The list command outputs NUL-terminated records, each a fingerprint (size,
+    mtime, hash, ...; may be empty) used to detect differing copies, a tab,
+    and the path. Paths may contain any byte except NUL."""
+    cmd = build_command(y, y['methods'][backup['method']]['list'])
+    env = os.environ.copy()
+    env.update(backup['env'])
+    lister = subprocess.Popen(cmd, stdout=subprocess.PIPE, cwd="/tmp", env=env)
+    # -k2 runs from the first tab to the end of the record, so it sorts by the full path
+    sorter = subprocess.Popen(["sort", "-z", "-u", "-t", "\t", "-k2", "-k1,1"], stdin=lister.stdout, stdout=subprocess.PIPE, env=dict(os.environ, LC_ALL="C"))
+    lister.stdout.close()  # so that lister gets SIGPIPE if sort exits early
+    return Listing(lister, sorter)
+
+
+def stop_listing(listing: Listing, timeout=5):
+    for proc in listing:
+        if proc.poll() is None:
+            proc.terminate()
+    for proc in listing:
+        try:
+            proc.wait(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            proc.wait()
+
+
+def read_listing(listing: Listing, head: int, name: str):
+    rest = b''
+    while chunk := listing.sorter.stdout.read(65536):
+        records = (rest + chunk).split(b'\0')
+        rest = records.pop()
+        for record in records:
+            fingerprint, tab, path = record.partition(b'\t')
+            if not tab:
+                raise Fail(f"malformed listing record from {name}: {record!r}")
+            yield path, head, fingerprint
+    if rest:
+        raise Fail(f"truncated listing record from {name}: {rest!r}")
+
+
+def compare_heads(y, status) -> int:
+    """Compare the snapshot contents of every head that backs up the same
+    files.paths. All listings run in parallel, one process per head, and are
+    merged in a single streaming pass once every listing has completed. Paths
+    missing from some heads are counted as 'missing', paths whose fingerprints
+    disagree as 'changed'. Returns the number of missing and changed paths."""
+    backups = [x for x in config_to_backups(y) if 'list' in y['methods'][x['method']]]
+    if len(backups) < 2:
+        raise Fail("need at least two backups whose method defines a 'list' command")
+    names = [x['name'] for x in backups]
+
+    faults = 0
+    listings = [start_listing(y, backup) for backup in backups]
+    try:
+        # sort holds back its output until its input is complete, so waiting
+        # for the listers first keeps a failed head from reporting every path
+        # it lacks as missing
+        for listing in listings:
+            listing.lister.wait()
+        if failed := [name for name, x in zip(names, listings) if x.lister.returncode != 0]:
+            raise Fail("listing failed for", ", ".join(failed))
+
+        merged = heapq.merge(*[read_listing(x, i, name) for i, (x, name) in enumerate(zip(listings, names))])
+        for path, entries in itertools.groupby(merged, key=lambda x: x[0]):
+            fingerprints: dict[int, bytes] = {}
+            for _, head, fingerprint in entries:
+                if head in fingerprints:
+                    raise Fail(f"duplicate listing records for {path!r} from {names[head]}")
+                fingerprints[head] = fingerprint
+            path = os.fsdecode(path)
+            faulted = False
+            if len(fingerprints) < len(backups):
+                missing = [names[i] for i in range(len(backups)) if i not in fingerprints]
+                status('missing', path, extra=f"missing from {', '.join(missing)}")
+                faulted = True
+            if len(set(fingerprints.values())) > 1:
+                status('changed', path, extra="differs across heads")
+                faulted = True
+            if faulted:
+                faults += 1
+            else:
+                status('found', path)
+    except BaseException:
+        for listing in listings:
+            stop_listing(listing)
+        raise
+    finally:
+        for listing in listings:
+            listing.sorter.stdout.close()
+            listing.sorter.wait()
+
+    if failed := [name for name, x in zip(names, listings) if x.sorter.returncode != 0]:
+        raise Fail("sorting listing failed for", ", ".join(failed))
+
+    return faults
+
+
 def configure_backup_runtime(backup):
     storage = backup['storage']
     if backup['method'] == 'restic':
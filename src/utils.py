@@ -1,5 +1,6 @@
 import builtins
 import inspect
+import json
 import os
 import shutil
 import sys
@@ -31,8 +32,14 @@ class StatusKeeper:
     """A Counter that displays ephemeral status messages for all counter
     operations as well as permanent messages for certain counter types. In
     printzero mode, only paths are printed and ephemeral messages are not
-    shown."""
-    def __init__(self, preseed=None, total_files_expected=None, log=None, print0=False, ephemeral_reasons=""):
+    shown.
+
+    For very large file sets, ephemeral_interval rate-limits ephemeral updates
+    (e.g., 0.1 for 10 Hz), print0 output is written in batches of
+    print0_bufsize bytes, and if checkpoint is a path, a JSON snapshot of
+    stats() is written to it every checkpoint_interval seconds."""
+    def __init__(self, preseed=None, total_files_expected=None, log=None, print0=False, ephemeral_reasons="",
+                 ephemeral_interval=0.0, print0_bufsize=65536, checkpoint=None, checkpoint_interval=60.0):
         self.log = log
         self.print0 = print0
         self.c = OrderedCounter()
@@ -40,23 +47,40 @@ class StatusKeeper:
             self.preseed(preseed)
         self.total_files_expected = total_files_expected
         self.progress_count = 0
-        self.ephemeral_reasons = ephemeral_reasons.split()
+        self.ephemeral_reasons = set(ephemeral_reasons.split())
         self.is_tty = sys.stdout.isatty()
         self.tty_cols, _ = shutil.get_terminal_size()
         self.time_start = time.time()
+        self.ephemeral_interval = ephemeral_interval
+        self.ephemeral_next = 0.0
+        self.ephemeral_shown = False
+        self.print0_bufsize = print0_bufsize
+        self.print0_buf: list[bytes] = []
+        self.print0_buflen = 0
+        self.checkpoint = checkpoint
+        self.checkpoint_interval = checkpoint_interval
+        self.checkpoint_next = time.monotonic() + checkpoint_interval
+        self.checkpoint_failed = False
 
     def preseed(self, preseed: list):
         self.c.update({x: 0 for x in preseed})
 
     def __call__(self, reason, path, highlight=None, flags="", extra: Optional[str] = None, coverage=None):
         self.c[reason] += 1
+        self.maybe_checkpoint()
+        if self.print0:
+            self.write0(path)
+            return
+        ephemeral = reason in self.ephemeral_reasons
+        if ephemeral:
+            # rate-limited messages are not displayed but still logged
+            due = self.ephemeral_due()
+            if not due and not (self.log and self.is_tty):
+                return
         try:
             path.encode()
         except UnicodeEncodeError:
-            path = path.encode('utf8', 'surrogateescape')
-        if self.print0:
-            self.print(path, end='\0')
-            return
+            path = path.encode('utf8', 'surrogateescape').decode('utf8', 'replace')
         if '\r' in path:
             path = path.replace('\r', r"$'\r'")
         if '\n' in path:
@@ -68,12 +92,35 @@ class StatusKeeper:
         mesg = f"{reason:<16.16} {cov}{path}{extra}"
         if flags:
             mesg += " " + flags
-        if reason in self.ephemeral_reasons:
-            self.ephemeral(mesg, log=True)
+        if ephemeral:
+            if due:
+                self.ephemeral(mesg, log=True)
+            else:
+                self.log(True, mesg)
         else:
             self.ephemeral()
             self.print(mesg)
 
+    def write0(self, path):
+        """Buffer a NUL-terminated path, writing out a batch once
+        print0_bufsize bytes have accumulated."""
+        data = os.fsencode(path) + b'\0'
+        self.print0_buf.append(data)
+        self.print0_buflen += len(data)
+        if self.log:
+            self.log(False, path)
+        if self.print0_buflen >= self.print0_bufsize:
+            self.flush()
+
+    def flush(self):
+        if not self.print0_buf:
+            return
+        sys.stdout.flush()
+        sys.stdout.buffer.write(b''.join(self.print0_buf))
+        sys.stdout.buffer.flush()
+        self.print0_buf.clear()
+        self.print0_buflen = 0
+
     def print(self, mesg, ephemeral=False, log=True, **nargs):
         if ephemeral:
             print('\r' + mesg + '\033[K\r', end='', flush=True, file=sys.stderr)
@@ -84,29 +131,90 @@ class StatusKeeper:
         if log and self.log:
             self.log(stderr, mesg)
 
+    def ephemeral_due(self) -> bool:
+        """True if an ephemeral message would be displayed now. Callers use
+        this to skip formatting messages that would be rate-limited away."""
+        return self.is_tty and time.monotonic() >= self.ephemeral_next
+
     def ephemeral(self, *args, log=False):
-        mesg = " ".join(args)
-        if self.is_tty:
-            mesg = mesg[:self.tty_cols - 1]
-            self.print(mesg, ephemeral=True, log=log)
+        if not self.is_tty:
+            return
+        if not args:
+            # clear the status line, but only if something is on it
+            if self.ephemeral_shown:
+                self.print("", ephemeral=True, log=False)
+                self.ephemeral_shown = False
+            return
+        now = time.monotonic()
+        if now < self.ephemeral_next:
+            return
+        self.ephemeral_next = now + self.ephemeral_interval
+        mesg = " ".join(args)[:self.tty_cols - 1]
+        self.print(mesg, ephemeral=True, log=log)
+        self.ephemeral_shown = True
 
     def progress(self, path, step=1):
         self.progress_count += step
+        self.maybe_checkpoint()
+        if not self.ephemeral_due():
+            return
         last = f"/{self.total_files_expected}" if self.total_files_expected else ""
         self.ephemeral(f"[{self.progress_count}{last}] {path}")
 
     def progress_percent(self, step=1, mesg=None):
         self.progress_count += step
+        self.maybe_checkpoint()
+        if not self.ephemeral_due():
+            return
         pct = 100 * self.progress_count / self.total_files_expected
         mesg = " " + mesg if mesg else ""
         self.ephemeral(f"[{self.progress_count}/{self.total_files_expected}] {pct:0.1f}%{mesg}", log=False)
 
     def progress_rate(self, mesg=None):
         self.progress_count += 1
+        self.maybe_checkpoint()
+        if not self.ephemeral_due():
+            return
         rate = self.progress_count / (time.time() - self.time_start)
         self.ephemeral(f"[{self.progress_count}][{int(rate)} files/sec] {mesg}", log=False)
 
+    def stats(self) -> dict:
+        """Return a machine-readable snapshot of the counters. Unlike
+        print_stats, this does not modify the counters and is safe to call at
+        any time."""
+        elapsed = time.time() - self.time_start
+        return {
+            'counts': dict(self.c),
+            'progress_count': self.progress_count,
+            'total_files_expected': self.total_files_expected,
+            'faults': self.num_faults(),
+            'start_time': self.time_start,
+            'elapsed': elapsed,
+            'rate': self.progress_count / elapsed if elapsed > 0 else 0.0,
+        }
+
+    def maybe_checkpoint(self):
+        if self.checkpoint and time.monotonic() >= self.checkpoint_next:
+            self.write_checkpoint()
+
+    def write_checkpoint(self):
+        """Atomically replace the checkpoint file with the current stats().
+        The checkpoint is secondary output, so errors are reported once and
+        otherwise ignored."""
+        self.checkpoint_next = time.monotonic() + self.checkpoint_interval
+        temp_path = f"{self.checkpoint}.tmp"
+        try:
+            with open(temp_path, "wt") as f:
+                json.dump(self.stats(), f)
+            os.replace(temp_path, self.checkpoint)
+        except OSError as e:
+            if not self.checkpoint_failed:
+                self.checkpoint_failed = True
+                self.ephemeral()
+                self.print(f"unable to write checkpoint: {e}", file=sys.stderr)
+
     def print_stats(self):
+        self.flush()
         if self.total_files_expected:
             self.c['files'] = self.total_files_expected
             remaining = self.total_files_expected - self.progress_count
@@ -133,11 +241,14 @@ class StatusKeeper:
         self.print("; ".join(s), file=sys.stderr)
 
     def __del__(self):
+        self.flush()
+        if self.checkpoint:
+            self.write_checkpoint()
         if self.c:
             self.print_stats()
 
     def num_faults(self, exclude_unknown=False):
-        fault_list = "hash-changed missing lost".split()
+        fault_list = "hash-changed changed missing lost".split()
         if not exclude_unknown:
             fault_list.append("unknown")
         return sum([self.c[x] for x in fault_list])
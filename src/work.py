@@ -1,14 +1,15 @@
 import os
 import yaml
 from pathlib import PurePath
+from typing import Optional
 from src import utils
 from src import hydra
 
 
 class Work:
-    def __init__(self, configdir: os.PathLike):
+    def __init__(self, configdir: os.PathLike, checkpoint: Optional[os.PathLike] = None):
         self.configdir = self.resolve_configdir(configdir)
-        self.status = utils.StatusKeeper(ephemeral_reasons="already-stored ignored")
+        self.status = utils.StatusKeeper(ephemeral_reasons="already-stored ignored found", ephemeral_interval=0.1, checkpoint=checkpoint)
         self.config = self.load_configfile()
 
     def resolve_configdir(self, configdir) -> PurePath:
@@ -49,4 +50,5 @@ def status(work):
 
 
 def verify(work):
-    print("TODO: verify")
+    if faults := hydra.compare_heads(work.config, work.status):
+        raise hydra.Fail(f"{faults:,} paths missing or changed across heads")
@@ -0,0 +1,80 @@
+import pytest
+from src import hydra
+from src import utils
+
+LIST_SCRIPT = """#!/bin/sh
+cat "$RESTIC_PASSWORD"
+exit $(cat "$RESTIC_PASSWORD.exit" 2>/dev/null || echo 0)
+"""
+
+
+def make_config(tmp_path, listings: dict, exit_codes=None):
+    script = tmp_path / "list"
+    script.write_text(LIST_SCRIPT)
+    script.chmod(0o755)
+    backups = {}
+    for name, records in listings.items():
+        listing = tmp_path / name
+        listing.write_bytes(b''.join(b'%s\t%s\0' % (fp, path) for path, fp in records))
+        if exit_codes and name in exit_codes:
+            (tmp_path / f"{name}.exit").write_text(str(exit_codes[name]))
+        backups[name] = dict(method='restic', storage='s', storage_path='p', password=str(listing))
+    return {
+        'files': {'paths': ['/data']},
+        'storages': {'s': {}},
+        'methods': {'restic': {'list': f"{script} {{}}"}},
+        'backups': backups,
+    }
+
+
+def test_compare_heads(tmp_path, capsys):
+    y = make_config(tmp_path, {
+        'a': [(b'z', b'1'), (b'b\tc', b'1'), (b'a', b'1'), (b'n\nl', b'')],
+        'b': [(b'a', b'1'), (b'b\tc', b'2'), (b'n\nl', b'')],
+    })
+    status = utils.StatusKeeper(ephemeral_reasons="found")
+    assert hydra.compare_heads(y, status) == 2
+    assert status.c == {'found': 2, 'changed': 1, 'missing': 1}
+    assert status.stats()['faults'] == 2
+    out = capsys.readouterr().out
+    assert "z missing from b" in out
+    assert "b\tc differs across heads" in out
+
+
+def test_compare_heads_missing_and_changed(tmp_path, capsys):
+    y = make_config(tmp_path, {
+        'a': [(b'a', b'1')],
+        'b': [(b'a', b'2')],
+        'c': [],
+    })
+    status = utils.StatusKeeper()
+    assert hydra.compare_heads(y, status) == 1
+    assert status.c == {'missing': 1, 'changed': 1}
+    assert status.stats()['faults'] == 2
+
+
+def test_compare_heads_duplicate_records(tmp_path):
+    y = make_config(tmp_path, {
+        'a': [(b'a', b'1'), (b'a', b'2')],
+        'b': [(b'a', b'1')],
+    })
+    with pytest.raises(hydra.Fail, match="duplicate listing records"):
+        hydra.compare_heads(y, utils.StatusKeeper())
+
+
+def test_compare_heads_listing_failure(tmp_path, capsys):
+    y = make_config(tmp_path, {
+        'a': [(b'a', b'1'), (b'd', b'1')],
+        'b': [(b'a', b'1')],
+    }, exit_codes={'b': 3})
+    status = utils.StatusKeeper()
+    with pytest.raises(hydra.Fail, match="listing failed"):
+        hydra.compare_heads(y, status)
+    assert not status.c
+    assert capsys.readouterr().out == ""
+
+
+def test_compare_heads_needs_two_heads(tmp_path):
+    y = make_config(tmp_path, {'a': [(b'a', b'1')]})
+    with pytest.raises(hydra.Fail):
+        hydra.compare_heads(y, utils.StatusKeeper())
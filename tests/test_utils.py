@@ -0,0 +1,63 @@
+import json
+from src import utils
+
+
+def test_print0_batches_output(capsysbinary):
+    status = utils.StatusKeeper(print0=True, print0_bufsize=8)
+    status('found', 'abc')
+    assert capsysbinary.readouterr().out == b''
+    status('found', 'defgh')
+    assert capsysbinary.readouterr().out == b'abc\0defgh\0'
+    status('found', 'x')
+    status.flush()
+    assert capsysbinary.readouterr().out == b'x\0'
+
+
+def test_print0_surrogate_path(capsysbinary):
+    status = utils.StatusKeeper(print0=True)
+    status('found', 'caf\udce9')
+    status.flush()
+    assert capsysbinary.readouterr().out == b'caf\xe9\0'
+
+
+def test_checkpoint_contents(tmp_path):
+    checkpoint = tmp_path / "stats.json"
+    status = utils.StatusKeeper(total_files_expected=10, checkpoint=checkpoint, checkpoint_interval=0)
+    status('missing', 'a')
+    status.progress('b')
+    status.progress('c')
+    stats = json.loads(checkpoint.read_text())
+    assert stats['counts'] == {'missing': 1}
+    assert stats['progress_count'] == 2
+    assert stats['total_files_expected'] == 10
+    assert stats['faults'] == 1
+    assert stats == {**status.stats(), 'elapsed': stats['elapsed'], 'rate': stats['rate']}
+
+
+def test_checkpoint_error_warns_once(tmp_path, capsys):
+    status = utils.StatusKeeper(checkpoint=tmp_path / "missing" / "stats.json", checkpoint_interval=0)
+    status.progress('a')
+    status.progress('b')
+    assert capsys.readouterr().err.count("unable to write checkpoint") == 1
+
+
+def test_rate_limited_messages_are_logged(capsys):
+    logged = []
+    status = utils.StatusKeeper(log=lambda stderr, mesg: logged.append(mesg), ephemeral_reasons="found", ephemeral_interval=60)
+    status.is_tty = True
+    status('found', 'a')
+    status('found', 'b')
+    assert [x.split() for x in logged] == [['found', 'a'], ['found', 'b']]
+    assert capsys.readouterr().err.count('found') == 1
+
+
+def test_clearing_keeps_rate_limit(capsys):
+    status = utils.StatusKeeper(ephemeral_reasons="found", ephemeral_interval=60)
+    status.is_tty = True
+    status('found', 'a')
+    status('missing', 'b')
+    status('found', 'c')
+    captured = capsys.readouterr()
+    assert 'found            a' in captured.err
+    assert 'missing          b' in captured.out
+    assert 'found            c' not in captured.err